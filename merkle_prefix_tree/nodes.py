@@ -2,7 +2,9 @@
 # -*- coding: utf-8 -*-
 
 class TreeNode:
-    def __init__(self, bit):
+    __slots__ = ('bit', 'left', 'right', 'parent', 'hash')
+
+    def __init__(self, bit=None):
         self.bit = bit
         self.left = None
         self.right = None
@@ -15,16 +17,17 @@ class TreeNode:
 
 
 class InteriorNode(TreeNode):
-    def __init__(self, bit=None):
-        TreeNode.__init__(self, bit)
+    __slots__ = ()
 
 
 class DataNode(TreeNode):
+    __slots__ = ('data',)
+
     def __init__(self, bit, data, hash_func, serialize_func):
-        TreeNode.__init__(self, bit)
+        # Fields are set directly to skip the TreeNode.__init__ call
+        self.bit = bit
+        self.left = None
+        self.right = None
+        self.parent = None
         self.data = data
-        self._hash_data(hash_func, serialize_func)
-
-    def _hash_data(self, hash_func, serialize_func):
-        serialized_data = serialize_func(self.data)
-        self.hash = hash_func(serialized_data)
+        self.hash = hash_func(serialize_func(data))
@@ -11,7 +11,8 @@ Properties of a Merkle Prefix Tree:
         leaf DataNode
     3) Prefixes are strings that only contain either a 0 or 1
         character. A 0 corresponds to a left subtree and a 1
-        corresponds to a right subtree
+        corresponds to a right subtree. Prefixes can also be given as
+        bytes of the same characters or as the equivalent int
     4) The length of a prefix must be equivalent to the height of the tree
     5) When appending an element to the tree, InteriorNodes are created as
         needed until the height of the tree is reached and the leaf DataNode
@@ -19,8 +20,8 @@ Properties of a Merkle Prefix Tree:
     6) Since InteriorNodes are added only as needed, large amounts of the
         tree will contain EmptyNodes. These EmptyNodes are purely conceptual,
         meaning there aren't concrete nodes that are created for EmptyNodes.
-        To do hash calculations with EmptyNodes, the _empty_tree_hash_dict
-        dictionary is used. This contains precomputed hash values of the
+        To do hash calculations with EmptyNodes, the _empty_tree_hashes
+        tuple is used. This contains precomputed hash values of the
         EmptyNodes at the various levels of the tree from the root to the
         height of the tree based on an empty tree.
 
@@ -37,12 +38,81 @@ There are three types of nodes within the tree:
             of the tree
 """
 
+import sys
 import json
+import math
 import hashlib
+import weakref
 
 from .nodes import InteriorNode, DataNode
 from .exceptions import AppendOnlyError
 
+# hashlib's sha256 is backed by OpenSSL, which already dispatches to the
+# SHA-NI or ARMv8 SHA2 instructions at runtime when the CPU supports them
+_sha256 = hashlib.sha256
+_blake2b = hashlib.blake2b
+
+# Empty subtree hash chains keyed by hash_func and then by height. The
+# hash_funcs are only weakly referenced, so the chains of a hash_func are
+# dropped along with it instead of piling up for the life of the process
+_empty_tree_hash_chains = weakref.WeakKeyDictionary()
+
+
+def _empty_tree_hash_chain(height, hash_func):
+    """Return hashes of theoretical empty nodes at each level of a tree.
+
+    The result is cached, so trees of the same height and hash_func share
+    one immutable tuple instead of rehashing the chain on every __init__.
+    A hash_func that can't be cached (e.g. an unhashable callable or one
+    that can't be weakly referenced) gets a newly computed chain.
+
+    Args:
+        height: The height of the tree.
+        hash_func: The hash function of the tree.
+
+    Returns:
+        A tuple that contains the theoretical hash of a subtree that
+            contains strictly empty nodes, indexed by the level of the
+            root of the subtree within the tree.
+    """
+    try:
+        height_chain_dict = _empty_tree_hash_chains.setdefault(hash_func, {})
+    except TypeError:
+        return _compute_empty_tree_hash_chain(height, hash_func)
+
+    empty_tree_hashes = height_chain_dict.get(height)
+    if empty_tree_hashes is None:
+        empty_tree_hashes = _compute_empty_tree_hash_chain(height, hash_func)
+        height_chain_dict[height] = empty_tree_hashes
+    return empty_tree_hashes
+
+
+def _compute_empty_tree_hash_chain(height, hash_func):
+    """Compute hashes of theoretical empty nodes at each level of a tree.
+
+    Args:
+        height: The height of the tree.
+        hash_func: The hash function of the tree.
+
+    Returns:
+        A tuple that contains the theoretical hash of a subtree that
+            contains strictly empty nodes, indexed by the level of the
+            root of the subtree within the tree.
+    """
+    # k_empty is used in the calculation of an EmptyNode
+    k_empty = bin(0)
+    curr_hash = hash_func(k_empty)
+
+    # Init hash_lst with the leaf EmptyNode
+    hash_lst = [None] * (height + 1)
+    hash_lst[height] = curr_hash
+
+    # Traversing the tree down up when calculating these hashes
+    for curr_height in range(height - 1, -1, -1):
+        curr_hash = hash_func(curr_hash + curr_hash)
+        hash_lst[curr_height] = curr_hash
+    return tuple(hash_lst)
+
 
 class MerklePrefixTree:
     """Representation of a Merkle Prefix Tree."""
@@ -77,32 +147,50 @@ class MerklePrefixTree:
         self._serialize_func = serialize_func if serialize_func else self.default_serialize_func
 
         self._root_node = InteriorNode()
-        self._empty_tree_hash_dict = self._precompute_empty_hashes()
+
+        # Index of the leaf DataNodes keyed by prefix for direct lookups
+        self._data_node_dict = {}
+
+        # DataNodes whose hash is not yet reflected in the tree's hashes,
+        # keyed by prefix so a replaced DataNode doesn't stay queued
+        self._pending_data_nodes = {}
+
+        # Set when a rehash failed partway, leaving the lower levels of the
+        # pending paths rehashed and the upper levels stale
+        self._rehash_interrupted = False
+        self._empty_tree_hashes = self._precompute_empty_hashes()
+
+    def __repr__(self):
+        class_name = self.__class__.__name__
+        hash_func = getattr(self._hash_func, '__qualname__',
+                            repr(self._hash_func))
+        serialize_func = getattr(self._serialize_func, '__qualname__',
+                                 repr(self._serialize_func))
+        return ('%s(height=%s, append_only=%s, hash_func=%s, '
+                'serialize_func=%s)' % (class_name,
+                                        self._height,
+                                        self._append_only,
+                                        hash_func,
+                                        serialize_func))
 
     def _precompute_empty_hashes(self):
         """Precompute hashes of theoretical empty nodes at each level in tree.
 
+        The hashes only depend on the height and hash_func of the tree, so
+        they are shared with the other trees of the same height and
+        hash_func through _empty_tree_hash_chain.
+
         Returns:
-            hash_dict: A dictionary that contains the theorical hash of a
-                subtree.
-            that contains strictly empty nodes at each level within the tree.
+            A tuple that contains the theoretical hash of a subtree that
+                contains strictly empty nodes, indexed by the level of the
+                root of the subtree within the tree.
         """
-        # k_empty is used in the calculation of an EmptyNode
-        k_empty = bin(0)
-        curr_hash = self._hash_func(k_empty)
-
-        # Init hash_dict with the leaf EmptyNode
-        hash_dict = {self._height: curr_hash}
-        for i in range(self._height):
-            curr_hash = self._hash_func(curr_hash + curr_hash)
-
-            # Traversing the tree down up when calculating these hashes
-            curr_height = self._height - i - 1
-            hash_dict[curr_height] = curr_hash
+        empty_tree_hashes = _empty_tree_hash_chain(self._height,
+                                                   self._hash_func)
 
         # When the tree is empty, the root will have an empty hash
-        self._root_node.hash = curr_hash
-        return hash_dict
+        self._root_node.hash = empty_tree_hashes[0]
+        return empty_tree_hashes
 
     def get_root_hash(self):
         """Return the hash of the root_node of the MerklePrefixTree.
@@ -110,93 +198,198 @@ class MerklePrefixTree:
         Returns:
             A bytes object.
         """
+        self._rehash_pending()
         return self._root_node.hash
 
     def get_data_node(self, prefix):
         """Return the DataNode at the given prefix within the tree.
 
         Args:
-            prefix: A string of 0's and 1's that maps to a leaf in the tree.
+            prefix: A str or bytes of 0's and 1's, or the equivalent int,
+                that maps to a leaf in the tree.
 
         Returns:
-            curr_node: A DataNode object or None if DataNode that corresponds
-                to the prefix doesn't exist yet.
+            A DataNode object or None if DataNode that corresponds to the
+                prefix doesn't exist yet.
 
         Raises:
             ValueError: If length of prefix is not equivalent to height of
-                the tree or prefix contains characters not in the set
-                {'0', '1'}.
+                the tree, prefix contains characters not in the set
+                {'0', '1'} or an int prefix is out of range.
         """
-        self._verify_prefix(prefix)
-
-        # Traverse the tree following the prefix bit by bit
-        curr_node = self._root_node
-        for bit in prefix:
-            curr_node = curr_node.left if bit == '0' else curr_node.right
-
-            # Return None when the data_node is not found
-            if curr_node is None:
-                return None
-        return curr_node
+        prefix = self._normalize_prefix(prefix)
+        return self._data_node_dict.get(prefix)
 
     def append(self, prefix, to_append):
         """Append the DataNode to_append to the tree at the given prefix.
 
+        The hashes of the InteriorNodes are not updated by the append. They
+        are updated once for all pending appends the next time a hash of
+        the tree is needed.
+
         Args:
-            prefix: A string of 0's and 1's that maps to a leaf in the tree.
+            prefix: A str or bytes of 0's and 1's, or the equivalent int,
+                that maps to a leaf in the tree.
             to_append: The object that will be appended to the tree at the
             given prefix.
 
         Raises:
             ValueError: If length of prefix is not equivalent to height of
-                the tree or prefix contains characters not in the set
-                {'0', '1'}.
+                the tree, prefix contains characters not in the set
+                {'0', '1'} or an int prefix is out of range.
             AppendOnlyError: If trying to append to existing prefix when
                 append_only instance variable is set to True.
         """
-        self._verify_prefix(prefix)
+        prefix = self._normalize_prefix(prefix)
+        self._insert_data_node(prefix, to_append)
+
+    def bulk_append(self, items):
+        """Append many objects to the tree.
+
+        All prefixes are verified before any DataNode is inserted. When the
+        tree is append_only, the prefixes are also checked against the
+        tree and the rest of the batch first, so a conflicting batch leaves
+        the tree unchanged. Like append, the impacted InteriorNodes are
+        rehashed once for all the appended DataNodes the next time a hash
+        of the tree is needed, so an InteriorNode shared by several
+        appended prefixes is hashed once instead of once per append.
 
-        # Create the new DataNode that will be appended
-        new_data_node = DataNode(prefix[-1],
+        Args:
+            items: An iterable of (prefix, to_append) tuples where each
+                prefix is a str or bytes of 0's and 1's, or the equivalent
+                int.
+
+        Raises:
+            ValueError: If length of a prefix is not equivalent to height of
+                the tree, a prefix contains characters not in the set
+                {'0', '1'} or an int prefix is out of range.
+            AppendOnlyError: If trying to append to existing prefix, or to
+                the same prefix twice, when append_only instance variable
+                is set to True.
+        """
+        items = [(self._normalize_prefix(prefix), to_append)
+                 for prefix, to_append in items]
+
+        if self._append_only:
+            data_node_dict = self._data_node_dict
+            batch_prefixes = set()
+            for prefix, _ in items:
+                if prefix in data_node_dict or prefix in batch_prefixes:
+                    error_msg = ('cannot append because DataNode '
+                                 'already exists at prefix. Tree '
+                                 'is append_only')
+                    raise AppendOnlyError(error_msg)
+                batch_prefixes.add(prefix)
+
+        for prefix, to_append in items:
+            self._insert_data_node(prefix, to_append)
+
+    def _insert_data_node(self, prefix, to_append):
+        """Insert a new DataNode at the given prefix without rehashing.
+
+        InteriorNodes are only created where the path to the prefix does
+        not exist yet. The new DataNode is queued for rehashing unless it
+        replaces a DataNode with the same hash. A DataNode that replaces a
+        queued DataNode takes its place in the queue.
+
+        Args:
+            prefix: A normalized int prefix that maps to a leaf in the
+                tree.
+            to_append: The object that will be appended to the tree at the
+                given prefix.
+
+        Returns:
+            new_data_node: The DataNode that was inserted.
+
+        Raises:
+            AppendOnlyError: If trying to append to existing prefix when
+                append_only instance variable is set to True.
+        """
+        existing_node = self._data_node_dict.get(prefix)
+        if existing_node is not None and self._append_only:
+            error_msg = ('cannot append because DataNode '
+                         'already exists at prefix. Tree '
+                         'is append_only')
+            raise AppendOnlyError(error_msg)
+
+        # Create the new DataNode before touching the tree, so a failure to
+        # serialize or hash to_append leaves the tree unchanged
+        go_right = prefix & 1
+        new_data_node = DataNode('1' if go_right else '0',
                                  to_append,
                                  self._hash_func,
                                  self._serialize_func)
 
-        # Add nodes to the tree
+        # Walk down to the parent of the leaf, adding missing InteriorNodes
         curr_node = self._root_node
-        for i in range(self._height):
-
-            # Find the next bit of the prefix on the path within the tree
-            bit = prefix[i]
-            prev_node = curr_node
-            curr_node = curr_node.left if bit == '0' else curr_node.right
-
-            # Set the parent and the parent's left and right node pointers
-            new_node = InteriorNode(bit)
-            if i == self._height - 1:
-                new_node = new_data_node
-            new_node.parent = prev_node
-            if bit == '0':
-                new_node.parent.left = new_node
-            else:
-                new_node.parent.right = new_node
-
-            # Add node depending on the current level within the tree
-            if i < self._height - 1:
-                if not curr_node:
-                    curr_node = new_node
-            else:
-                if not self._append_only:
-                    curr_node = new_node
+        for shift in range(self._height - 1, 0, -1):
+            go_right = (prefix >> shift) & 1
+            next_node = curr_node.right if go_right else curr_node.left
+            if next_node is None:
+                next_node = InteriorNode('1' if go_right else '0')
+                next_node.parent = curr_node
+                if go_right:
+                    curr_node.right = next_node
                 else:
-                    error_msg = ("cannot append because DataNode"
-                                 "already exists at prefix. Tree"
-                                 "is append_only")
-                    raise AppendOnlyError(error_msg)
+                    curr_node.left = next_node
+            curr_node = next_node
+
+        # Set the new DataNode as the leaf of the path
+        go_right = prefix & 1
+        new_data_node.parent = curr_node
+        if go_right:
+            curr_node.right = new_data_node
+        else:
+            curr_node.left = new_data_node
+        self._data_node_dict[prefix] = new_data_node
+        pending_data_nodes = self._pending_data_nodes
+        if (existing_node is None or
+                existing_node.hash != new_data_node.hash or
+                prefix in pending_data_nodes):
+            pending_data_nodes[prefix] = new_data_node
+        return new_data_node
+
+    def _normalize_prefix(self, prefix):
+        """Verify the prefix and convert it to an int.
+
+        The bits of the int, from the most significant of the height bits
+        to the least significant, are the path from the root_node to the
+        leaf. A 0 bit corresponds to a left subtree and a 1 bit to a right
+        subtree.
+
+        Args:
+            prefix: A str or bytes of 0's and 1's, or the equivalent int,
+                that maps to a leaf in the tree.
+
+        Returns:
+            An int that maps to a leaf in the tree.
+
+        Raises:
+            ValueError: If length of prefix is not equivalent to height of
+                the tree, prefix contains characters not in the set
+                {'0', '1'}, an int prefix is out of range or prefix is a
+                bool.
+        """
+        # bool is a subclass of int, but True is not a meaningful prefix
+        if isinstance(prefix, bool):
+            error_msg = ('invalid prefix: ' + str(prefix) +
+                         '. Prefix must be a str, bytes or int, not bool')
+            raise ValueError(error_msg)
+
+        if isinstance(prefix, int):
+            if not 0 <= prefix < 1 << self._height:
+                error_msg = ('invalid prefix: ' + str(prefix) +
+                             '. Int prefix must be in range [0, 2**' +
+                             str(self._height) + ')')
+                raise ValueError(error_msg)
+            return prefix
+
+        # Every byte decodes to one char, so _verify_prefix rejects bad bytes
+        if isinstance(prefix, (bytes, bytearray)):
+            prefix = prefix.decode('latin-1')
+        self._verify_prefix(prefix)
+        return int(prefix, 2)
 
-        # Update the hashes of the impacted nodes
-        self._rehash(curr_node)
-    
     def _verify_prefix(self, prefix):
         """Verify if prefix is valid length and contains valid character.
         
@@ -216,41 +409,96 @@ class MerklePrefixTree:
             error_msg = 'invalid prefix length. Must be length of ' + height
             raise ValueError(error_msg)
         
-        # Iterate through prefix and verify that it only contains valid chars
-        for char in prefix:
-            if char not in ('0', '1'):
-                error_msg = ('invalid prefix: ' + prefix +
-                             '. Permitted characters are in set {0, 1}')
-                raise ValueError(error_msg)
-
-    def _rehash(self, leaf_node):
-        """Rehash the hashes of the nodes from leaf_node to root_node.
+        # Anything left after stripping the valid chars from both ends means
+        # the prefix contains an invalid char, so no per-char loop is needed
+        if prefix.strip('01'):
+            error_msg = ('invalid prefix: ' + prefix +
+                         '. Permitted characters are in set {0, 1}')
+            raise ValueError(error_msg)
 
-        Starting at the leaf_node, the rehash function will travel
-        up the tree by looking at each node's parent. Each parent
-        node that is visited will recalculate its hash with the new
-        children node hash values.
+    @staticmethod
+    def _split_inclusion_proof(inclusion_proof, hash_len):
+        """Split a proof of inclusion joined into bytes into its hashes.
 
         Args:
-            leaf_node: The leaf node that the rehashing to the root will begin.
+            inclusion_proof: A list of hashes, or the hashes joined into a
+                single bytes object.
+            hash_len: An int that is the length of each hash of the proof.
 
-        Raises:
-            TypeError: If leaf_node is not of type DataNode.
+        Returns:
+            A list of the hashes of the proof of inclusion, or None if the
+                joined hashes can't be split into hashes of hash_len.
+        """
+        if isinstance(inclusion_proof, (bytes, bytearray)):
+            if not hash_len or len(inclusion_proof) % hash_len:
+                return None
+            return [inclusion_proof[i:i + hash_len]
+                    for i in range(0, len(inclusion_proof), hash_len)]
+        return inclusion_proof
+
+    def _rehash_pending(self):
+        """Rehash the nodes impacted by the pending DataNodes.
+
+        If hash_func raises partway through, the pending DataNodes stay
+        queued and the next call rehashes their whole paths, since the
+        levels that were already rehashed would otherwise look unchanged
+        and stop the rehash early.
         """
-        if not isinstance(leaf_node, DataNode):
-            raise TypeError('cannot re_hash. leaf_node is not a DataNode')
+        if self._pending_data_nodes:
+            try:
+                self._rehash(self._pending_data_nodes.values(),
+                             stop_early=not self._rehash_interrupted)
+            except BaseException:
+                self._rehash_interrupted = True
+                raise
+            self._pending_data_nodes = {}
+            self._rehash_interrupted = False
+
+    def _rehash(self, leaf_nodes, stop_early=True):
+        """Rehash the hashes of the nodes from the leaf_nodes to root_node.
+
+        Starting at the leaf_nodes, the rehash function will travel up the
+        tree one level at a time by looking at each node's parent. Each
+        parent node that is visited will recalculate its hash with the new
+        children node hash values. A parent shared by several nodes of a
+        level is only rehashed once. Only the parents of nodes whose hash
+        changed are visited, so the rehash stops early when none of the
+        recalculated hashes of a level changed, unless stop_early is False.
 
-        curr_node = leaf_node
+        Args:
+            leaf_nodes: An iterable of the leaf nodes that the rehashing
+                to the root will begin.
+            stop_early: The boolean that determines if only the parents of
+                nodes whose hash changed are rehashed. If False, every node
+                along the paths to the root_node is rehashed.
+        """
+        hash_func = self._hash_func
+        empty_tree_hashes = self._empty_tree_hashes
+
+        changed_nodes = leaf_nodes
         for i in range(self._height - 1, -1, -1):
-            curr_node = curr_node.parent
-            empty_hash = self._empty_tree_hash_dict[i + 1]
+            empty_hash = empty_tree_hashes[i + 1]
+            parent_nodes = {node.parent for node in changed_nodes}
+
+            changed_nodes = []
+            for curr_node in parent_nodes:
+                # Using left and right node hash, recompute the hash
+                left_node = curr_node.left
+                right_node = curr_node.right
+                if left_node is None:
+                    new_hash = hash_func(empty_hash + right_node.hash)
+                elif right_node is None:
+                    new_hash = hash_func(left_node.hash + empty_hash)
+                else:
+                    new_hash = hash_func(left_node.hash + right_node.hash)
 
-            # Using left and right node hash, recompute the hash of curr_node
-            left_hash = curr_node.left.hash if curr_node.left else empty_hash
-            right_hash = curr_node.right.hash if curr_node.right else empty_hash
-            curr_node.hash = self._hash_hashes(left_hash,
-                                              right_hash,
-                                              self._hash_func)
+                if new_hash != curr_node.hash or not stop_early:
+                    curr_node.hash = new_hash
+                    changed_nodes.append(curr_node)
+
+            # The rest of the paths are unchanged when no hash changed
+            if not changed_nodes:
+                break
 
     def produce_inclusion_proof(self, prefix):
         """Produce proof that DataNode at prefix is included within the tree.
@@ -263,7 +511,8 @@ class MerklePrefixTree:
         the bit is 0, the right node's hash is added to the proof of inclusion.
 
         Args:
-            prefix: A string of 0's and 1's that maps to a leaf in the tree.
+            prefix: A str or bytes of 0's and 1's, or the equivalent int,
+                that maps to a leaf in the tree.
 
         Returns:
             inclusion_proof: A list of hashes of the nodes along the path from
@@ -271,24 +520,32 @@ class MerklePrefixTree:
                 corresponds to the prefix to the root_node of the tree.
 
         ValueError: If length of prefix is not equivalent to height of
-            the tree or prefix contains characters not in the set
-            {'0', '1'}.
+            the tree, prefix contains characters not in the set
+            {'0', '1'} or an int prefix is out of range.
         """
-        self._verify_prefix(prefix)
+        prefix = self._normalize_prefix(prefix)
+
+        # Return empty list when data node is not included in tree
+        if prefix not in self._data_node_dict:
+            return []
+        self._rehash_pending()
+
+        height = self._height
+        empty_tree_hashes = self._empty_tree_hashes
 
         curr_node = self._root_node
         inclusion_proof = []
-        for i in range(self._height):
-            bit = prefix[i]
-            opp_node = curr_node.right if bit == '0' else curr_node.left
-            curr_node = curr_node.left if bit == '0' else curr_node.right
-
-            # Return empty list when data node is not included in tree
-            if not curr_node:
-                return []
-            empty_tree_hash = self._empty_tree_hash_dict[i + 1]
-            new_proof_hash = opp_node.hash if opp_node else empty_tree_hash
-            inclusion_proof.append(new_proof_hash)
+        for i in range(height):
+            if (prefix >> (height - 1 - i)) & 1:
+                opp_node = curr_node.left
+                curr_node = curr_node.right
+            else:
+                opp_node = curr_node.right
+                curr_node = curr_node.left
+            if opp_node is None:
+                inclusion_proof.append(empty_tree_hashes[i + 1])
+            else:
+                inclusion_proof.append(opp_node.hash)
         return inclusion_proof
 
     def validate_inclusion_proof(self,
@@ -305,10 +562,13 @@ class MerklePrefixTree:
         is valid, otherwise it is not.
 
         Args:
-            prefix: A string of 0's and 1's that maps to a leaf in the tree.
+            prefix: A str or bytes of 0's and 1's, or the equivalent int,
+                that maps to a leaf in the tree.
             inclusion_proof: A list of hashes of the nodes along the path
                 from the given DataNode (DataNode hash not included) that
                 corresponds to the prefix to the root_node of the tree.
+                The hashes may also be given joined into a single bytes
+                object (e.g. b''.join(inclusion_proof)).
             included_hash: A bytes object that contains the hash of the
                 DataNode that the inclusion_proof is trying to prove
                 is within the tree.
@@ -320,34 +580,369 @@ class MerklePrefixTree:
                 or not.
 
         ValueError: If length of prefix is not equivalent to height of
-            the tree or prefix contains characters not in the set
-            {'0', '1'}.
+            the tree, prefix contains characters not in the set
+            {'0', '1'} or an int prefix is out of range.
         """
-        self._verify_prefix(prefix)
+        prefix = self._normalize_prefix(prefix)
+        hash_func = self._hash_func
+
+        inclusion_proof = self._split_inclusion_proof(inclusion_proof,
+                                                      len(included_hash))
+
+        # A proof can't have more hashes than there are levels in the tree
+        if inclusion_proof is None or len(inclusion_proof) > self._height:
+            return False
+
+        # Drop the bits below the deepest level covered by the proof so the
+        # lowest bit is always the bit of the current level
+        prefix >>= self._height - len(inclusion_proof)
 
         calculated_hash = included_hash
-        for i in range(len(inclusion_proof) - 1, -1, -1):
-            bit = prefix[i]
-            left_hash = calculated_hash if bit == '0' else inclusion_proof[i]
-            right_hash = calculated_hash if bit == '1' else inclusion_proof[i]
-            calculated_hash = self._hash_hashes(left_hash,
-                                          right_hash,
-                                          self._hash_func)
+        for proof_hash in reversed(inclusion_proof):
+            if prefix & 1:
+                calculated_hash = hash_func(proof_hash + calculated_hash)
+            else:
+                calculated_hash = hash_func(calculated_hash + proof_hash)
+            prefix >>= 1
         return calculated_hash == root_hash
 
+    def validate_inclusion_proofs_batch(self,
+                                        prefixes,
+                                        inclusion_proofs,
+                                        included_hashes,
+                                        root_hash):
+        """Validate many proofs of inclusion against the same root_hash.
+
+        Each proof is validated like in validate_inclusion_proof. Proofs of
+        prefixes that share a path near the root hash the same pairs of
+        hashes, so the hash of each distinct pair is calculated once for
+        the whole batch.
+
+        Args:
+            prefixes: A list of strs or bytes of 0's and 1's, or the
+                equivalent ints, that map to leaves in the tree.
+            inclusion_proofs: A list of the proofs of inclusion, one for
+                each prefix. Each proof may be a list of hashes or the
+                hashes joined into a single bytes object.
+            included_hashes: A list of the hashes of the DataNodes that the
+                inclusion_proofs are trying to prove are within the tree.
+            root_hash: A bytes object that contains the hash of the root_node
+                of the tree that the proofs of inclusion are generated from.
+
+        Returns:
+            results: A list of booleans that confirm if each given proof of
+                inclusion is valid or not.
+
+        Raises:
+            ValueError: If length of a prefix is not equivalent to height of
+                the tree, a prefix contains characters not in the set
+                {'0', '1'}, an int prefix is out of range or the numbers of
+                prefixes, inclusion_proofs and included_hashes differ.
+        """
+        prefixes = [self._normalize_prefix(prefix) for prefix in prefixes]
+        inclusion_proofs = list(inclusion_proofs)
+        included_hashes = list(included_hashes)
+        hash_func = self._hash_func
+
+        # Every prefix must come with its own proof and included hash
+        if not len(prefixes) == len(inclusion_proofs) == len(included_hashes):
+            error_msg = ('prefixes, inclusion_proofs and included_hashes '
+                         'must have the same length')
+            raise ValueError(error_msg)
+
+        # Hashes of the concatenated pairs already calculated in this batch
+        pair_hash_dict = {}
+
+        results = []
+        for prefix, inclusion_proof, included_hash in zip(prefixes,
+                                                           inclusion_proofs,
+                                                           included_hashes):
+            inclusion_proof = self._split_inclusion_proof(inclusion_proof,
+                                                          len(included_hash))
+            if (inclusion_proof is None or
+                    len(inclusion_proof) > self._height):
+                results.append(False)
+                continue
+
+            prefix >>= self._height - len(inclusion_proof)
+            calculated_hash = included_hash
+            for proof_hash in reversed(inclusion_proof):
+                if prefix & 1:
+                    concat_hash = proof_hash + calculated_hash
+                else:
+                    concat_hash = calculated_hash + proof_hash
+                prefix >>= 1
+
+                calculated_hash = pair_hash_dict.get(concat_hash)
+                if calculated_hash is None:
+                    calculated_hash = hash_func(concat_hash)
+                    pair_hash_dict[concat_hash] = calculated_hash
+            results.append(calculated_hash == root_hash)
+        return results
+
+    def produce_compressed_inclusion_proof(self, prefix):
+        """Produce a proof of inclusion that leaves out empty siblings.
+
+        In a sparse tree most siblings along a path are EmptyNodes, whose
+        hashes any verifier can take from the empty tree hashes. Only the
+        hashes of the siblings that are not empty are included, along with
+        a bitmap of the levels that they belong to.
+
+        Args:
+            prefix: A str or bytes of 0's and 1's, or the equivalent int,
+                that maps to a leaf in the tree.
+
+        Returns:
+            A tuple of the bitmap and the list of sibling hashes, or None if
+                the DataNode at the prefix is not included in the tree. The
+                bit for the level below the root_node is the most
+                significant of the height bits of the bitmap, like in an
+                int prefix. The sibling hashes are ordered from the root_node
+                to the DataNode.
+
+        Raises:
+            ValueError: If length of prefix is not equivalent to height of
+                the tree, prefix contains characters not in the set
+                {'0', '1'} or an int prefix is out of range.
+        """
+        prefix = self._normalize_prefix(prefix)
+        if prefix not in self._data_node_dict:
+            return None
+        self._rehash_pending()
+
+        height = self._height
+        curr_node = self._root_node
+        bitmap = 0
+        sibling_hashes = []
+        for shift in range(height - 1, -1, -1):
+            if (prefix >> shift) & 1:
+                opp_node = curr_node.left
+                curr_node = curr_node.right
+            else:
+                opp_node = curr_node.right
+                curr_node = curr_node.left
+            if opp_node is not None:
+                bitmap |= 1 << shift
+                sibling_hashes.append(opp_node.hash)
+        return bitmap, sibling_hashes
+
+    def validate_compressed_inclusion_proof(self,
+                                            prefix,
+                                            compressed_proof,
+                                            included_hash,
+                                            root_hash):
+        """Validate a proof from produce_compressed_inclusion_proof.
+
+        The levels that are not set in the bitmap of the proof take the
+        hash of the EmptyNode at that level. The full proof of inclusion is
+        then validated like in validate_inclusion_proof.
+
+        Args:
+            prefix: A str or bytes of 0's and 1's, or the equivalent int,
+                that maps to a leaf in the tree.
+            compressed_proof: A tuple of the bitmap and the list of sibling
+                hashes.
+            included_hash: A bytes object that contains the hash of the
+                DataNode that the proof is trying to prove is within the
+                tree.
+            root_hash: A bytes object that contains the hash of the root_node
+                of the tree that the proof of inclusion is generated from.
+
+        Returns:
+            A boolean that confirms if the given proof of inclusion is valid
+                or not.
+
+        Raises:
+            ValueError: If length of prefix is not equivalent to height of
+                the tree, prefix contains characters not in the set
+                {'0', '1'} or an int prefix is out of range.
+        """
+        prefix = self._normalize_prefix(prefix)
+        bitmap, sibling_hashes = compressed_proof
+        height = self._height
+        empty_tree_hashes = self._empty_tree_hashes
+
+        # The number of sibling hashes must match the bits of the bitmap
+        if (bitmap >> height or
+                bin(bitmap).count('1') != len(sibling_hashes)):
+            return False
+
+        sibling_hash_iter = iter(sibling_hashes)
+        inclusion_proof = []
+        for i in range(height):
+            if (bitmap >> (height - 1 - i)) & 1:
+                inclusion_proof.append(next(sibling_hash_iter))
+            else:
+                inclusion_proof.append(empty_tree_hashes[i + 1])
+        return self.validate_inclusion_proof(prefix,
+                                             inclusion_proof,
+                                             included_hash,
+                                             root_hash)
+
+    def produce_batch_inclusion_proof(self, prefixes):
+        """Produce one proof that the DataNodes at prefixes are included.
+
+        Unlike a list of proofs from produce_inclusion_proof, the hash of
+        each sibling is included at most once, and siblings that can be
+        calculated from the other prefixes of the batch are left out.
+        Going up the tree one level at a time, the hash of the sibling of
+        each node on the paths is included, ordered by the index of the
+        node within its level, unless the sibling is itself on a path.
+
+        Args:
+            prefixes: A list of strs or bytes of 0's and 1's, or the
+                equivalent ints, that map to leaves in the tree.
+
+        Returns:
+            batch_proof: A list of the hashes of the siblings that are
+                needed to calculate the hash of the root_node, or None if a
+                DataNode of the prefixes is not included in the tree. The
+                list is empty when the prefixes cover every DataNode that
+                is needed to calculate the hash of the root_node.
+
+        Raises:
+            ValueError: If length of a prefix is not equivalent to height of
+                the tree, a prefix contains characters not in the set
+                {'0', '1'} or an int prefix is out of range.
+        """
+        prefixes = sorted({self._normalize_prefix(prefix)
+                           for prefix in prefixes})
+        data_node_dict = self._data_node_dict
+        if not all(prefix in data_node_dict for prefix in prefixes):
+            return None
+        self._rehash_pending()
+
+        height = self._height
+        empty_tree_hashes = self._empty_tree_hashes
+
+        # Hashes of both children of every node along the paths, keyed by
+        # the level and the index of the child within its level
+        child_hash_dict = {}
+        for prefix in prefixes:
+            curr_node = self._root_node
+            for level in range(1, height + 1):
+                index = prefix >> (height - level)
+                left_index = index & ~1
+                if (level, left_index) not in child_hash_dict:
+                    empty_hash = empty_tree_hashes[level]
+                    left_node = curr_node.left
+                    right_node = curr_node.right
+                    child_hash_dict[level, left_index] = (
+                        empty_hash if left_node is None else left_node.hash)
+                    child_hash_dict[level, left_index | 1] = (
+                        empty_hash if right_node is None else right_node.hash)
+                curr_node = curr_node.right if index & 1 else curr_node.left
+
+        batch_proof = []
+        indices = prefixes
+        for level in range(height, 0, -1):
+            index_set = set(indices)
+            for index in indices:
+                if index ^ 1 not in index_set:
+                    batch_proof.append(child_hash_dict[level, index ^ 1])
+
+            # Shifting the sorted indices keeps them sorted
+            indices = list(dict.fromkeys(index >> 1 for index in indices))
+        return batch_proof
+
+    def validate_batch_inclusion_proof(self,
+                                       prefixes,
+                                       batch_proof,
+                                       included_hashes,
+                                       root_hash):
+        """Validate a proof from produce_batch_inclusion_proof.
+
+        The hashes of the nodes along the paths are calculated one level at
+        a time, taking the hash of a sibling from the batch_proof only when
+        the sibling is not on a path itself. If the calculated root hash is
+        equivalent to the given root_hash and every hash of the
+        batch_proof was used, then the proof is valid, otherwise it is not.
+        The proof is also not valid if the number of included_hashes
+        doesn't match the number of prefixes.
+
+        Args:
+            prefixes: A list of strs or bytes of 0's and 1's, or the
+                equivalent ints, that map to leaves in the tree.
+            batch_proof: A list of the hashes of the siblings from
+                produce_batch_inclusion_proof.
+            included_hashes: A list of the hashes of the DataNodes that the
+                batch_proof is trying to prove are within the tree, one for
+                each prefix.
+            root_hash: A bytes object that contains the hash of the root_node
+                of the tree that the proof of inclusion is generated from.
+
+        Returns:
+            A boolean that confirms if the given proof of inclusion is valid
+                or not.
+
+        Raises:
+            ValueError: If length of a prefix is not equivalent to height of
+                the tree, a prefix contains characters not in the set
+                {'0', '1'} or an int prefix is out of range.
+        """
+        hash_func = self._hash_func
+        prefixes = list(prefixes)
+        included_hashes = list(included_hashes)
+
+        # Every prefix must come with the hash that it is proven to hold
+        if len(prefixes) != len(included_hashes):
+            return False
+
+        # Duplicated prefixes are deduplicated into a single path
+        hash_dict = {}
+        for prefix, included_hash in zip(prefixes, included_hashes):
+            prefix = self._normalize_prefix(prefix)
+
+            # A prefix can't be proven to hold two different hashes
+            if hash_dict.setdefault(prefix, included_hash) != included_hash:
+                return False
+        if not hash_dict:
+            return False
+
+        proof_hash_iter = iter(batch_proof)
+        for _ in range(self._height):
+            next_hash_dict = {}
+            for index in sorted(hash_dict):
+                sibling_hash = hash_dict.get(index ^ 1)
+                if sibling_hash is None:
+                    sibling_hash = next(proof_hash_iter, None)
+                    if sibling_hash is None:
+                        return False
+                elif index & 1:
+                    # Already calculated along with its left sibling
+                    continue
+
+                if index & 1:
+                    concat_hash = sibling_hash + hash_dict[index]
+                else:
+                    concat_hash = hash_dict[index] + sibling_hash
+                next_hash_dict[index >> 1] = hash_func(concat_hash)
+            hash_dict = next_hash_dict
+
+        # Every hash of the proof must be used to calculate the root hash
+        if next(proof_hash_iter, None) is not None:
+            return False
+        return hash_dict[0] == root_hash
+
     def pretty_print(self):
-        """Recursively traverse the tree and pretty-print the node hashes.
+        """Traverse the tree and pretty-print the node hashes.
 
         When pretty-printing the tree, the levels and distinction between
         left and right subtree are clearly seen through the use of '├── '
-        for left subtrees and '└── ' for right subtrees.
+        for left subtrees and '└── ' for right subtrees. The tree is
+        traversed with an explicit stack and the lines are written to
+        stdout at once.
         """
-        curr_node = self._root_node
-
-        def recurse_tree(root,
-                         level=0,
-                         subtree=None,
-                         prefix_print=''):
+        self._rehash_pending()
+        height = self._height
+        empty_hash_strs = [str(empty_hash)
+                           for empty_hash in self._empty_tree_hashes]
+        lines = []
+
+        # The right subtree is pushed first so the left subtree prints first
+        stack = [(self._root_node, 0, None, '')]
+        while stack:
+            root, level, subtree, prefix_print = stack.pop()
             level_divider = ''
             if subtree == 'l':
                 level_divider = prefix_print + '├── '
@@ -355,15 +950,14 @@ class MerklePrefixTree:
             elif subtree == 'r':
                 level_divider = prefix_print + '└── '
                 prefix_print += '    '
-            if not root:
-                if level <= self._height:
-                    empty_hash = str(self._empty_tree_hash_dict[level])
-                    print(level_divider + empty_hash)
-                return
-            print(level_divider + str(root.hash))
-            recurse_tree(root.left, level + 1, 'l', prefix_print)
-            recurse_tree(root.right, level + 1, 'r', prefix_print)
-        recurse_tree(curr_node)
+            if root is None:
+                if level <= height:
+                    lines.append(level_divider + empty_hash_strs[level])
+                continue
+            lines.append(level_divider + str(root.hash))
+            stack.append((root.right, level + 1, 'r', prefix_print))
+            stack.append((root.left, level + 1, 'l', prefix_print))
+        sys.stdout.write('\n'.join(lines) + '\n')
 
     def get_prefix_path_lst(self, prefix):
         """Return a list of nodes on the path corresponding to the prefix.
@@ -371,21 +965,26 @@ class MerklePrefixTree:
         Method used for debugging purposes.
 
         Args:
-            prefix: A string of 0's and 1's that maps to a leaf in the tree.
+            prefix: A str or bytes of 0's and 1's, or the equivalent int,
+                that maps to a leaf in the tree.
 
         Returns:
             path_lst: A list of InteriorNodes and one leaf DataNode.
 
         ValueError: If length of prefix is not equivalent to height of
-            the tree or prefix contains characters not in the set
-            {'0', '1'}.
+            the tree, prefix contains characters not in the set
+            {'0', '1'} or an int prefix is out of range.
         """
-        self._verify_prefix(prefix)
+        prefix = self._normalize_prefix(prefix)
+        self._rehash_pending()
 
         curr_node = self._root_node
         path_lst = [curr_node]
-        for bit in prefix:
-            curr_node = curr_node.left if bit == '0' else curr_node.right
+        for shift in range(self._height - 1, -1, -1):
+            if (prefix >> shift) & 1:
+                curr_node = curr_node.right
+            else:
+                curr_node = curr_node.left
             path_lst.append(curr_node)
         return path_lst
 
@@ -405,65 +1004,66 @@ class MerklePrefixTree:
         """Return if MerklePrefixTree is append_only or not."""
         return self._append_only
 
-    def _hash_hashes(self,
-                    hash_1,
-                    hash_2,
-                    hash_func):
-        """Concat two given hashes and hash the result using the hash_func.
+    @staticmethod
+    def default_hash_func(to_hash):
+        """Hash the given to_hash input.
 
-        When the hashes are concatenated, hash_1 is on the left and hash_2 is
-        on the right.
+        Before hashing, str input is encoded using utf-8. This default
+        function uses a one-shot sha256 hash.
 
         Args:
-            hash_1: The first hash value.
-            hash_2: The second hash value.
-            hash_func: The hash function used to do any hash calculations.
+            to_hash: A str or bytes-like object that will be hashed.
 
         Returns:
-            A bytes object that contains the hash of the concatenated hashes.
+            A bytes object that contains the hash of to_hash.
         """
-        concat_hash = hash_1 + hash_2
-        return hash_func(concat_hash)
+        if isinstance(to_hash, str):
+            to_hash = to_hash.encode('utf-8')
+        return _sha256(to_hash).digest()
 
     @staticmethod
-    def default_hash_func(to_hash):
-        """Hash the given to_hash input.
+    def blake2b_hash_func(to_hash):
+        """Hash the given to_hash input using blake2b with a 32 byte digest.
 
-        Before hashing, the input to_hash is encoded. This default function
-        uses utf-8 and sha256 hash.
+        This function can be given as the hash_func of a tree where sha256
+        compatibility isn't needed. blake2b is faster than sha256 on CPUs
+        without sha256 instructions. Before hashing, str input is encoded
+        using utf-8.
 
         Args:
-            to_hash: Any object that will be hashed.
+            to_hash: A str or bytes-like object that will be hashed.
 
         Returns:
-            digest: A bytes object that contains the hash of to_hash.
+            A bytes object that contains the hash of to_hash.
         """
-
-        def encode(to_encode,
-                   encoding='utf-8',
-                   errors='strict'):
-            if isinstance(to_encode, str):
-                return to_encode.encode(encoding, errors)
-            return to_encode
-
-        def sha256(to_hash):
-            new_hash = hashlib.sha256()
-            new_hash.update(to_hash)
-            return new_hash.digest()
-        to_hash = encode(to_hash)
-        digest = sha256(to_hash)
-        return digest
+        if isinstance(to_hash, str):
+            to_hash = to_hash.encode('utf-8')
+        return _blake2b(to_hash, digest_size=32).digest()
 
     @staticmethod
     def default_serialize_func(to_serialize):
         """Serialize the to_serialize input using json.
 
+        str and bytes inputs are returned as is. ints, bools, None and
+        finite floats are converted directly, which gives the same string
+        as json without setting up the json encoder.
+
         Args:
             to_serialize: Any object that will be serialized.
 
         Returns:
-            A string of the serialized data.
+            A string or bytes object of the serialized data.
         """
-        if not isinstance(to_serialize, str):
-            return json.dumps(to_serialize, default=lambda obj: obj.__dict__)
-        return to_serialize
+        if isinstance(to_serialize, (str, bytes)):
+            return to_serialize
+        to_serialize_type = type(to_serialize)
+        if to_serialize_type is int:
+            return str(to_serialize)
+        if to_serialize_type is bool:
+            return 'true' if to_serialize else 'false'
+        if to_serialize is None:
+            return 'null'
+        # json writes NaN and infinities differently than repr
+        if to_serialize_type is float and math.isfinite(to_serialize):
+            return repr(to_serialize)
+        return json.dumps(to_serialize, default=lambda obj: obj.__dict__)
@@ -12,9 +12,7 @@ def encode(to_encode, encoding='utf-8', errors='strict'):
 
 
 def sha256(to_hash):
-    new_hash = hashlib.sha256()
-    new_hash.update(to_hash)
-    return new_hash.digest()
+    return hashlib.sha256(to_hash).digest()
 
 
 def default_hash_func(to_hash):
@@ -7,6 +7,10 @@ More information about the tests can be found in the docstrings
 within each test method below.
 """
 
+import gc
+import sys
+import json
+
 import pytest
 
 from merkle_prefix_tree import MerklePrefixTree, AppendOnlyError
@@ -48,13 +52,60 @@ class TestMerklePrefixTree:
         # The height of the tree excludes the root node
         assert tree.get_tree_height() == self._test_height
 
+    def test_init_shares_empty_tree_hashes(self, setup):
+        """Test if trees with the same height and hash_func share hashes."""
+        tree_1 = setup(self._test_height)
+        tree_2 = setup(self._test_height)
+        blake2b_tree = setup(self._test_height,
+                             hash_func=MerklePrefixTree.blake2b_hash_func)
+
+        assert tree_1._empty_tree_hashes is tree_2._empty_tree_hashes
+        assert tree_2.get_root_hash() == tree_2._empty_tree_hashes[0]
+        assert (blake2b_tree._empty_tree_hashes !=
+                tree_1._empty_tree_hashes)
+
+    def test_init_unhashable_hash_func(self, setup):
+        """Test if an unhashable hash_func is accepted without caching."""
+        class UnhashableHashFunc:
+            def __eq__(self, other):
+                return isinstance(other, UnhashableHashFunc)
+
+            def __call__(self, to_hash):
+                return MerklePrefixTree.default_hash_func(to_hash)
+
+        tree = setup(self._test_height, hash_func=UnhashableHashFunc())
+        default_tree = setup(self._test_height)
+        assert tree.get_root_hash() == default_tree.get_root_hash()
+
+    def test_init_does_not_keep_hash_func_alive(self, setup):
+        """Test if the empty tree hashes cache doesn't keep hash_func."""
+        def hash_func(to_hash):
+            return MerklePrefixTree.default_hash_func(to_hash)
+
+        tree = setup(self._test_height, hash_func=hash_func)
+        tree_module = sys.modules[MerklePrefixTree.__module__]
+        assert hash_func in tree_module._empty_tree_hash_chains
+
+        del tree, hash_func
+        gc.collect()
+        assert all(getattr(cached_func, '__name__', None) != 'hash_func'
+                   for cached_func in tree_module._empty_tree_hash_chains)
+
+    def test_repr(self, setup):
+        """Test if repr shows the attributes and functions of the tree."""
+        tree = setup(self._test_height, True)
+        assert repr(tree) == ('MerklePrefixTree(height=4, append_only=True, '
+                              'hash_func=MerklePrefixTree.default_hash_func, '
+                              'serialize_func=MerklePrefixTree.'
+                              'default_serialize_func)')
+
     def test__precompute_empty_hashes(self, setup):
         """Test if empty tree hashes are correctly computed."""
         tree = setup(self._test_height)
-        empty_tree_hash_dict = tree._empty_tree_hash_dict
+        empty_tree_hashes = tree._empty_tree_hashes
 
         # len should be _test_height + 1 since height doesn't include the root
-        assert len(empty_tree_hash_dict) == self._test_height + 1
+        assert len(empty_tree_hashes) == self._test_height + 1
 
         # Compute the root hash of an empty tree
         hash_func = tree.get_hash_func()
@@ -62,8 +113,8 @@ class TestMerklePrefixTree:
         for i in range(self._test_height):
             curr_hash = hash_func(curr_hash + curr_hash)
 
-        # Verify computed root hash is equal to empty_tree_hash_dict root hash
-        assert curr_hash == empty_tree_hash_dict[0]
+        # Verify computed root hash is equal to empty_tree_hashes root hash
+        assert curr_hash == empty_tree_hashes[0]
 
     def test_append_get_data_node_roundtrip(self, setup):
         """Test if rountrip of append and get_data_node functions correctly."""
@@ -76,6 +127,168 @@ class TestMerklePrefixTree:
         # Verify that the retreived node contains _test_to_append
         assert retrieved_node.data == self._test_to_append
 
+    def test_append_multiple_prefixes(self, setup):
+        """Test if appending to several prefixes keeps every DataNode."""
+        tree = setup(self._test_height)
+        prefixes = ['0000', '0001', '1010']
+
+        for i, prefix in enumerate(prefixes):
+            tree.append(prefix, i)
+
+        # Every appended DataNode is still reachable and provably included
+        hash_func = tree.get_hash_func()
+        serial_func = tree.get_serialize_func()
+        for i, prefix in enumerate(prefixes):
+            assert tree.get_data_node(prefix).data == i
+            poi = tree.produce_inclusion_proof(prefix)
+            included_hash = hash_func(serial_func(i))
+            assert tree.validate_inclusion_proof(prefix,
+                                                 poi,
+                                                 included_hash,
+                                                 tree.get_root_hash())
+
+    def test_append_replace_existing_prefix(self, setup):
+        """Test if appending to an existing prefix updates the root hash."""
+        tree = setup(self._test_height)
+        tree.append('0001', 1)
+        tree.append(self._test_prefix, self._test_to_append)
+        root_hash = tree.get_root_hash()
+
+        # Appending the same object again leaves the root hash unchanged
+        tree.append(self._test_prefix, self._test_to_append)
+        assert tree.get_root_hash() == root_hash
+
+        # Appending a new object replaces the DataNode and the root hash
+        tree.append(self._test_prefix, self._test_to_append + 1)
+        other_tree = setup(self._test_height)
+        other_tree.append('0001', 1)
+        other_tree.append(self._test_prefix, self._test_to_append + 1)
+        assert tree.get_root_hash() == other_tree.get_root_hash()
+        assert tree.get_root_hash() != root_hash
+
+    def test_append_same_prefix_keeps_one_pending_node(self, setup):
+        """Test if replacing a pending DataNode doesn't grow the queue."""
+        tree = setup(self._test_height)
+        for i in range(100):
+            tree.append(self._test_prefix, i)
+
+        assert len(tree._pending_data_nodes) == 1
+
+        expected_tree = setup(self._test_height)
+        expected_tree.append(self._test_prefix, 99)
+        assert tree.get_root_hash() == expected_tree.get_root_hash()
+
+    def test_get_root_hash_after_failed_rehash(self, setup):
+        """Test if a rehash that failed partway is completed on retry."""
+        hash_calls = {'count': 0, 'fail_at': None}
+
+        def hash_func(to_hash):
+            hash_calls['count'] += 1
+            if hash_calls['count'] == hash_calls['fail_at']:
+                raise RuntimeError('hash failed')
+            return MerklePrefixTree.default_hash_func(to_hash)
+
+        tree = setup(self._test_height, hash_func=hash_func)
+        tree.append('0000', 1)
+        tree.get_root_hash()
+        tree.append('0001', 2)
+
+        # Fail on the third hash of the rehash, after two levels are rehashed
+        hash_calls['fail_at'] = hash_calls['count'] + 3
+        with pytest.raises(RuntimeError):
+            tree.get_root_hash()
+
+        expected_tree = setup(self._test_height)
+        expected_tree.bulk_append([('0000', 1), ('0001', 2)])
+        assert tree.get_root_hash() == expected_tree.get_root_hash()
+
+    def test_append_root_hash_matches_full_rehash(self, setup):
+        """Test if deferred rehashing gives the root of a full rehash."""
+        tree = setup(self._test_height)
+        hash_func = tree.get_hash_func()
+        serial_func = tree.get_serialize_func()
+        empty_tree_hashes = tree._empty_tree_hashes
+        leaves = {}
+
+        # Compute the hash of the subtree at path from scratch
+        def subtree_hash(path):
+            if not any(prefix.startswith(path) for prefix in leaves):
+                return empty_tree_hashes[len(path)]
+            if len(path) == self._test_height:
+                return hash_func(serial_func(leaves[path]))
+            return hash_func(subtree_hash(path + '0') +
+                             subtree_hash(path + '1'))
+
+        for prefix, to_append in [('0101', 1), ('0100', 2), ('1110', 3),
+                                  ('0101', 4)]:
+            tree.append(prefix, to_append)
+            leaves[prefix] = to_append
+
+            # Reading the root hash rehashes the pending nodes
+            assert tree.get_root_hash() == subtree_hash('')
+
+    def test_append_unserializable_leaves_tree_unchanged(self, setup):
+        """Test if a failed serialize doesn't leave nodes in the tree."""
+        tree = setup(self._test_height)
+
+        # A set has no __dict__, so the json fallback can't serialize it
+        with pytest.raises(AttributeError):
+            tree.append('0000', {1, 2})
+        assert tree._root_node.left is None
+
+        tree.append('1000', 1)
+        expected_tree = setup(self._test_height)
+        expected_tree.append('1000', 1)
+        assert tree.get_root_hash() == expected_tree.get_root_hash()
+        assert None not in tree.produce_inclusion_proof('1000')
+
+    def test_bulk_append_matches_append(self, setup):
+        """Test if bulk_append results in the same root hash as append."""
+        items = [('0000', 1), ('0001', 2), ('0110', 3), ('1111', 4)]
+        tree = setup(self._test_height)
+        bulk_tree = setup(self._test_height)
+
+        for prefix, to_append in items:
+            tree.append(prefix, to_append)
+        bulk_tree.bulk_append(items)
+
+        assert bulk_tree.get_root_hash() == tree.get_root_hash()
+        assert bulk_tree.get_data_node('0110').data == 3
+
+    @pytest.mark.parametrize("items", [[('0001', 1), ('0000', 2)],
+                                       [('0001', 1), ('0001', 2)]])
+    def test_bulk_append_when_append_only_is_atomic(self, setup, items):
+        """Test if a conflicting append_only batch leaves tree unchanged."""
+        tree = setup(self._test_height, True)
+        tree.append('0000', 0)
+        root_hash = tree.get_root_hash()
+
+        # Conflicts with the tree or within the batch raise before inserting
+        with pytest.raises(AppendOnlyError):
+            tree.bulk_append(items)
+
+        assert tree.get_data_node('0001') is None
+        assert tree.get_data_node('0000').data == 0
+        assert tree.get_root_hash() == root_hash
+
+    def test_append_int_prefix_roundtrip(self, setup):
+        """Test if an int prefix maps to the same leaf as its string."""
+        tree = setup(self._test_height)
+        tree.append(int('0110', 2), self._test_to_append)
+
+        retrieved_node = tree.get_data_node('0110')
+        assert retrieved_node.data == self._test_to_append
+        assert (tree.produce_inclusion_proof('0110') ==
+                tree.produce_inclusion_proof(int('0110', 2)))
+
+    def test_append_bytes_prefix_roundtrip(self, setup):
+        """Test if a bytes prefix maps to the same leaf as its string."""
+        tree = setup(self._test_height)
+        tree.append(b'0110', self._test_to_append)
+
+        retrieved_node = tree.get_data_node('0110')
+        assert retrieved_node.data == self._test_to_append
+
     def test_get_data_node_nonexisting(self, setup):
         """Test if get_data_node call for nonexisting node returns None."""
         tree = setup(self._test_height)
@@ -94,6 +307,14 @@ class TestMerklePrefixTree:
             tree.append(self._test_prefix, self._test_to_append)
             tree.append(self._test_prefix, self._test_to_append)
 
+    def test_append_when_append_only_first_append(self, setup):
+        """Test if first append to a prefix when append_only succeeds."""
+        tree = setup(self._test_height, True)
+        tree.append(self._test_prefix, self._test_to_append)
+
+        retrieved_node = tree.get_data_node(self._test_prefix)
+        assert retrieved_node.data == self._test_to_append
+
     def test_produce_inclusion_proof_validate_roundtrip(self, setup):
         """Test if rountrip of produce and validate poi functions correctly."""
         tree = setup(self._test_height)
@@ -113,6 +334,21 @@ class TestMerklePrefixTree:
                                                  root_hash)
         assert is_valid == True
 
+    def test_blake2b_hash_func_roundtrip(self, setup):
+        """Test if produce and validate poi roundtrip with blake2b hashes."""
+        hash_func = MerklePrefixTree.blake2b_hash_func
+        tree = setup(self._test_height, hash_func=hash_func)
+        tree.append(self._test_prefix, self._test_to_append)
+
+        poi = tree.produce_inclusion_proof(self._test_prefix)
+        serial_func = tree.get_serialize_func()
+        included_hash = hash_func(serial_func(self._test_to_append))
+        assert len(included_hash) == 32
+        assert tree.validate_inclusion_proof(self._test_prefix,
+                                             poi,
+                                             included_hash,
+                                             tree.get_root_hash())
+
     def test_produce_inclusion_proof_validate_roundtrip_fail(self,
                                                              setup):
         """Test if rountrip of produce and validate poi fails correctly."""
@@ -133,6 +369,236 @@ class TestMerklePrefixTree:
         # Should be False since poi isn't valid
         assert is_valid == False
 
+    def test_validate_inclusion_proofs_batch(self, setup):
+        """Test if batch validation agrees with validating each proof."""
+        tree = setup(self._test_height)
+        prefixes = ['0000', '0001', '0011', '1100']
+        tree.bulk_append((prefix, i) for i, prefix in enumerate(prefixes))
+
+        hash_func = tree.get_hash_func()
+        serial_func = tree.get_serialize_func()
+        pois = [tree.produce_inclusion_proof(prefix) for prefix in prefixes]
+        included_hashes = [hash_func(serial_func(i))
+                           for i in range(len(prefixes))]
+
+        # Swap in the hash of another object to make the last proof invalid
+        included_hashes[-1] = hash_func(serial_func('other'))
+
+        results = tree.validate_inclusion_proofs_batch(prefixes,
+                                                       pois,
+                                                       included_hashes,
+                                                       tree.get_root_hash())
+        assert results == [True, True, True, False]
+
+    def test_validate_inclusion_proofs_batch_length_mismatch(self, setup):
+        """Test if batch validation of unmatched inputs raises exception."""
+        tree = setup(self._test_height)
+        tree.append('0000', 0)
+
+        hash_func = tree.get_hash_func()
+        serial_func = tree.get_serialize_func()
+        poi = tree.produce_inclusion_proof('0000')
+
+        # Prefixes without a proof and hash must not be skipped silently
+        with pytest.raises(ValueError):
+            tree.validate_inclusion_proofs_batch(['0000', '0001', '1111'],
+                                                 [poi],
+                                                 [hash_func(serial_func(0))],
+                                                 tree.get_root_hash())
+
+    def test_validate_too_long_inclusion_proof(self, setup):
+        """Test if a proof longer than the tree height is invalid."""
+        tree = setup(self._test_height)
+        tree.append(self._test_prefix, self._test_to_append)
+
+        hash_func = tree.get_hash_func()
+        serial_func = tree.get_serialize_func()
+        included_hash = hash_func(serial_func(self._test_to_append))
+        root_hash = tree.get_root_hash()
+        poi = tree.produce_inclusion_proof(self._test_prefix)
+        long_poi = [root_hash] + poi
+
+        assert not tree.validate_inclusion_proof(self._test_prefix,
+                                                 long_poi,
+                                                 included_hash,
+                                                 root_hash)
+        assert tree.validate_inclusion_proofs_batch(
+            [self._test_prefix] * 2, [long_poi, poi],
+            [included_hash] * 2, root_hash) == [False, True]
+
+    def test_validate_joined_inclusion_proof(self, setup):
+        """Test if a proof joined into bytes validates like the list."""
+        tree = setup(self._test_height)
+        tree.bulk_append([('0000', 0), ('0110', 1)])
+
+        hash_func = tree.get_hash_func()
+        serial_func = tree.get_serialize_func()
+        joined_poi = b''.join(tree.produce_inclusion_proof('0110'))
+        root_hash = tree.get_root_hash()
+
+        assert tree.validate_inclusion_proof('0110',
+                                             joined_poi,
+                                             hash_func(serial_func(1)),
+                                             root_hash)
+        assert not tree.validate_inclusion_proof('0110',
+                                                 joined_poi,
+                                                 hash_func(serial_func(0)),
+                                                 root_hash)
+        assert tree.validate_inclusion_proofs_batch(['0110'],
+                                                    [joined_poi],
+                                                    [hash_func(serial_func(1))],
+                                                    root_hash) == [True]
+
+    def test_validate_malformed_joined_inclusion_proof(self, setup):
+        """Test if a joined proof that can't be split is invalid."""
+        tree = setup(self._test_height)
+        tree.append('0110', 1)
+
+        hash_func = tree.get_hash_func()
+        serial_func = tree.get_serialize_func()
+        included_hash = hash_func(serial_func(1))
+        joined_poi = b''.join(tree.produce_inclusion_proof('0110'))
+        root_hash = tree.get_root_hash()
+
+        # An empty included_hash or a trailing partial hash fails
+        assert not tree.validate_inclusion_proof('0110',
+                                                 joined_poi,
+                                                 b'',
+                                                 root_hash)
+        assert not tree.validate_inclusion_proof('0110',
+                                                 joined_poi + b'\x00',
+                                                 included_hash,
+                                                 root_hash)
+        assert tree.validate_inclusion_proofs_batch(['0110'],
+                                                    [joined_poi[:-1]],
+                                                    [included_hash],
+                                                    root_hash) == [False]
+
+    def test_compressed_inclusion_proof_roundtrip(self, setup):
+        """Test if compressed proofs only hold the non-empty siblings."""
+        tree = setup(self._test_height)
+        tree.bulk_append([('0000', 1), ('0011', 2), ('1000', 3)])
+
+        # Only the siblings of '0000' at levels 1 and 3 are not empty
+        bitmap, sibling_hashes = tree.produce_compressed_inclusion_proof(
+            '0000')
+        assert bitmap == 0b1010
+        assert len(sibling_hashes) == 2
+
+        hash_func = tree.get_hash_func()
+        serial_func = tree.get_serialize_func()
+        root_hash = tree.get_root_hash()
+        assert tree.validate_compressed_inclusion_proof(
+            '0000', (bitmap, sibling_hashes), hash_func(serial_func(1)),
+            root_hash)
+
+        # A wrong hash or a bitmap that doesn't match the hashes fails
+        assert not tree.validate_compressed_inclusion_proof(
+            '0000', (bitmap, sibling_hashes), hash_func(serial_func(2)),
+            root_hash)
+        assert not tree.validate_compressed_inclusion_proof(
+            '0000', (0b1000, sibling_hashes), hash_func(serial_func(1)),
+            root_hash)
+
+    @pytest.mark.parametrize("prefix", ['zz', '0' * (_test_height + 1)])
+    def test_validate_compressed_inclusion_proof_prefix_raises_exc(self,
+                                                                   setup,
+                                                                   prefix):
+        """Test if invalid prefix raises exception before proof checks."""
+        tree = setup(self._test_height)
+
+        # The malformed proof must not hide the invalid prefix
+        with pytest.raises(ValueError):
+            tree.validate_compressed_inclusion_proof(prefix,
+                                                     (1, []),
+                                                     b'',
+                                                     tree.get_root_hash())
+
+    def test_compressed_inclusion_proof_nonexisting(self, setup):
+        """Test if compressed proof of nonexisting DataNode is None."""
+        tree = setup(self._test_height)
+        assert tree.produce_compressed_inclusion_proof('0101') is None
+
+    def test_batch_inclusion_proof_roundtrip(self, setup):
+        """Test if a batch proof holds each needed sibling hash once."""
+        tree = setup(self._test_height)
+        prefixes = ['0000', '0001', '0011', '1100']
+        tree.bulk_append((prefix, i) for i, prefix in enumerate(prefixes))
+
+        # Siblings on the paths of other prefixes are left out
+        batch_proof = tree.produce_batch_inclusion_proof(prefixes)
+        assert len(batch_proof) == 5
+
+        hash_func = tree.get_hash_func()
+        serial_func = tree.get_serialize_func()
+        included_hashes = [hash_func(serial_func(i))
+                           for i in range(len(prefixes))]
+        root_hash = tree.get_root_hash()
+        assert tree.validate_batch_inclusion_proof(prefixes,
+                                                   batch_proof,
+                                                   included_hashes,
+                                                   root_hash)
+
+        # A wrong hash, a missing or an extra sibling hash fails
+        wrong_hashes = included_hashes[:-1] + [hash_func(serial_func(0))]
+        assert not tree.validate_batch_inclusion_proof(prefixes,
+                                                       batch_proof,
+                                                       wrong_hashes,
+                                                       root_hash)
+        assert not tree.validate_batch_inclusion_proof(prefixes,
+                                                       batch_proof[:-1],
+                                                       included_hashes,
+                                                       root_hash)
+        extra_proof = batch_proof + [root_hash]
+        assert not tree.validate_batch_inclusion_proof(prefixes,
+                                                       extra_proof,
+                                                       included_hashes,
+                                                       root_hash)
+
+    def test_batch_inclusion_proof_nonexisting(self, setup):
+        """Test if batch proof with a nonexisting DataNode is None."""
+        tree = setup(self._test_height)
+        tree.append('0000', 1)
+        assert tree.produce_batch_inclusion_proof(['0000', '0101']) is None
+
+    def test_batch_inclusion_proof_all_leaves(self, setup):
+        """Test if a batch proof of every leaf is empty and still valid."""
+        tree = setup(1)
+        tree.bulk_append([('0', 0), ('1', 1)])
+
+        batch_proof = tree.produce_batch_inclusion_proof(['0', '1'])
+        assert batch_proof == []
+
+        hash_func = tree.get_hash_func()
+        serial_func = tree.get_serialize_func()
+        assert tree.validate_batch_inclusion_proof(
+            ['0', '1'], batch_proof,
+            [hash_func(serial_func(0)), hash_func(serial_func(1))],
+            tree.get_root_hash())
+
+    def test_validate_batch_inclusion_proof_length_mismatch(self, setup):
+        """Test if prefixes without an included hash are not valid."""
+        tree = setup(self._test_height)
+        tree.bulk_append([('0000', 0), ('0001', 1)])
+
+        hash_func = tree.get_hash_func()
+        serial_func = tree.get_serialize_func()
+        batch_proof = tree.produce_batch_inclusion_proof(['0000'])
+        included_hash = hash_func(serial_func(0))
+        root_hash = tree.get_root_hash()
+
+        # '0001' has no included hash, so it can't be proven
+        assert not tree.validate_batch_inclusion_proof(['0000', '0001'],
+                                                       batch_proof,
+                                                       [included_hash],
+                                                       root_hash)
+
+        # Duplicated prefixes with the same hash prove a single path
+        assert tree.validate_batch_inclusion_proof(['0000', '0000'],
+                                                   batch_proof,
+                                                   [included_hash] * 2,
+                                                   root_hash)
+
     def test_produce_inclusion_proof_empty_proof(self, setup):
         """Test if invalid produce poi call results in empty poi."""
         tree = setup(self._test_height)
@@ -156,7 +622,8 @@ class TestMerklePrefixTree:
 
     @pytest.mark.parametrize("prefix", [_test_prefix * (_test_height - 1),
                                         _test_prefix * (_test_height + 1),
-                                        'a' * _test_height])
+                                        'a' * _test_height,
+                                        '0a' + '1' * (_test_height - 2)])
     def test_get_data_node_prefix_raises_exc(self, setup, prefix):
         """Test if invalid prefix raises exception."""
         tree = setup(self._test_height)
@@ -167,7 +634,8 @@ class TestMerklePrefixTree:
 
     @pytest.mark.parametrize("prefix", [_test_prefix * (_test_height - 1),
                                         _test_prefix * (_test_height + 1),
-                                        'a' * _test_height])
+                                        'a' * _test_height,
+                                        b'\xff' * _test_height])
     def test_append_prefix_raises_exc(self, setup, prefix):
         """Test if invalid prefix raises exception."""
         tree = setup(self._test_height)
@@ -175,3 +643,44 @@ class TestMerklePrefixTree:
         # Incorrect prefix lens or incorrect chars will raise exception
         with pytest.raises(ValueError) as exc:
             tree.append(prefix, self._test_to_append)
+
+    @pytest.mark.parametrize("prefix", [-1, 2 ** _test_height, True, False])
+    def test_append_int_prefix_raises_exc(self, setup, prefix):
+        """Test if out of range or bool int prefix raises exception."""
+        tree = setup(self._test_height)
+
+        # Int prefixes must fit within the height of the tree and bools
+        # are not accepted as int prefixes
+        with pytest.raises(ValueError) as exc:
+            tree.append(prefix, self._test_to_append)
+
+    def test_pretty_print(self, setup, capsys):
+        """Test if pretty_print prints the root and every level of a path."""
+        tree = setup(self._test_height)
+        tree.append(self._test_prefix, self._test_to_append)
+        tree.pretty_print()
+        lines = capsys.readouterr().out.splitlines()
+
+        # The root, then each node of the path and its empty sibling
+        assert len(lines) == 1 + 2 * self._test_height
+        assert lines[0] == str(tree.get_root_hash())
+
+        # The right subtree of the root is empty and is printed last
+        assert lines[-1] == '└── ' + str(tree._empty_tree_hashes[1])
+
+    @pytest.mark.parametrize("to_serialize", [0, -7, 2 ** 70, 'abc',
+                                              True, False, None, 1.0, -2.5,
+                                              1e100, float('nan'),
+                                              float('inf'), [1, 2],
+                                              {'a': 1}])
+    def test_default_serialize_func_matches_json(self, to_serialize):
+        """Test if the default serialize func output matches json."""
+        expected = (to_serialize if isinstance(to_serialize, str)
+                    else json.dumps(to_serialize))
+        serialized = MerklePrefixTree.default_serialize_func(to_serialize)
+        assert serialized == expected
+
+    def test_default_serialize_func_bytes(self):
+        """Test if bytes are serialized as is."""
+        serialized = MerklePrefixTree.default_serialize_func(b'\x00\x01')
+        assert serialized == b'\x00\x01'